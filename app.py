@@ -1,9 +1,17 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import datetime
 import calendar
+import random
+import re
+import threading
+import time
+import httplib2
+import google_auth_httplib2
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
 st.set_page_config(layout="wide")
 
@@ -11,12 +19,28 @@ st.title("SEO Intelligence Dashboard")
 
 SCOPES = ["https://www.googleapis.com/auth/webmasters.readonly"]
 
-credentials = service_account.Credentials.from_service_account_info(
-    st.secrets["google_service_account"],
-    scopes=SCOPES,
-)
+# long-lived credentials are a resource, not data: parse the service-account
+# key once per session instead of on every rerun
+@st.cache_resource
+def get_credentials():
+    return service_account.Credentials.from_service_account_info(
+        st.secrets["google_service_account"],
+        scopes=SCOPES,
+    )
 
-service = build("searchconsole", "v1", credentials=credentials)
+credentials = get_credentials()
+
+# one keep-alive transport per process: reuses the TLS connection across
+# reruns instead of paying a fresh handshake per fetch. httplib2 is not
+# thread-safe, so the transport travels with a lock serializing its use
+# across concurrent sessions
+@st.cache_resource
+def get_authorized_http():
+    http = google_auth_httplib2.AuthorizedHttp(
+        get_credentials(),
+        http=httplib2.Http(timeout=30)
+    )
+    return http, threading.Lock()
 
 site_url = "https://www.naukri.com"
 
@@ -75,19 +99,28 @@ brand_keywords = ["naukri","nakuri","nokri","nokari","naukari","login"]
 # FETCH DATA
 # -----------------------------
 
-def fetch_data(start,end):
+def week_slices(start,end):
+
+    slices = []
+    d = start
+
+    while d <= end:
+        slice_end = min(d + datetime.timedelta(days=6), end)
+        slices.append((d,slice_end))
+        d = slice_end + datetime.timedelta(days=1)
+
+    return slices
+
+def build_query(start,end):
 
-    request = {
+    return {
         "startDate": str(start),
         "endDate": str(end),
         "dimensions": ["query","page","device","date"],
         "rowLimit": 25000
     }
 
-    response = service.searchanalytics().query(
-        siteUrl=site_url,
-        body=request
-    ).execute()
+def rows_to_df(response):
 
     rows = response.get("rows", [])
 
@@ -107,80 +140,143 @@ def fetch_data(start,end):
 
     return pd.DataFrame(data)
 
+# reruns triggered by the sidebar filters reuse the cached months instead of
+# paying another 25k-row API query
+@st.cache_data(ttl=24*60*60, show_spinner=False)
+def fetch_months(current_range,prev_range):
+
+    # static_discovery skips the ~200 KB discovery-doc download, so the
+    # per-call build is cheap
+    service = build(
+        "searchconsole", "v1", credentials=credentials, static_discovery=True
+    )
+
+    results = {}
+
+    def store(request_id,response,exception):
+        if exception is not None:
+            raise exception
+        results[request_id] = response
+
+    # one multipart batch carries every slice of both months, so all the
+    # fetches share a single HTTPS round trip. Slicing each month into weekly
+    # windows keeps every query well under the 25k row cap: the date
+    # dimension makes the slices disjoint, so concatenating them loses nothing
+    batch = service.new_batch_http_request(callback=store)
+
+    for label,(start,end) in (("current",current_range),("prev",prev_range)):
+        for i,(s,e) in enumerate(week_slices(start,end)):
+            batch.add(
+                service.searchanalytics().query(
+                    siteUrl=site_url,
+                    body=build_query(s,e)
+                ),
+                request_id="%s:%d" % (label,i)
+            )
+
+    http, http_lock = get_authorized_http()
+
+    # sub-requests inside a batch are not retried by the client library, so
+    # back off and resend the whole batch on transient 429/5xx
+    with http_lock:
+        for attempt in range(5):
+            results.clear()
+            try:
+                batch.execute(http=http)
+                break
+            except HttpError as err:
+                if err.resp.status not in (429,500,502,503) or attempt == 4:
+                    raise
+                time.sleep(2**attempt + random.random())
+
+    def collect(label):
+        frames = [
+            rows_to_df(results[rid])
+            for rid in sorted(results, key=lambda r: int(r.split(":")[1]))
+            if rid.split(":")[0] == label
+        ]
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    return collect("current"), collect("prev")
+
 # -----------------------------
 # FETCH DATA
 # -----------------------------
 
-current_df = fetch_data(start_date,end_date)
-prev_df = fetch_data(prev_start,prev_end)
+current_df, prev_df = fetch_months(
+    (start_date,end_date),
+    (prev_start,prev_end)
+)
 
 if current_df.empty:
     st.warning("No data found")
     st.stop()
 
-current_df["date"] = pd.to_datetime(current_df["date"])
-
-if not prev_df.empty:
-    prev_df["date"] = pd.to_datetime(prev_df["date"])
-
 # -----------------------------
 # URL SECTION CLASSIFICATION
 # -----------------------------
 
-def classify_page(url):
-
-    if url == "https://www.naukri.com/":
-        return "Home"
-
-    if "/recruit/" in url:
-        return "Recruit"
-
-    if "/blog/" in url:
-        return "Blog"
-
-    if "/campus/" in url:
-        return "Campus"
-
-    if "/career-advice/" in url:
-        return "Career Advice"
+# rules are ordered: first match wins, same as the old if-chain
+SECTION_RULES = [
+    ("/recruit/","Recruit"),
+    ("/blog/","Blog"),
+    ("/campus/","Campus"),
+    ("/career-advice/","Career Advice"),
+    ("/resume-maker/","Resume Maker"),
+    ("/naukri360/","Naukri360"),
+    ("/code360/","Code360"),
+    ("-jobs-in-","Keyword City Jobs"),
+    ("jobs-in","City Jobs"),
+    ("-jobs","Keyword Jobs"),
+]
 
-    if "/resume-maker/" in url:
-        return "Resume Maker"
+def classify_pages(pages):
 
-    if "/naukri360/" in url:
-        return "Naukri360"
+    conditions = [pages == "https://www.naukri.com/"]
+    choices = ["Home"]
 
-    if "/code360/" in url:
-        return "Code360"
+    for token,section in SECTION_RULES:
+        conditions.append(pages.str.contains(token,regex=False))
+        choices.append(section)
 
-    if "-jobs-in-" in url:
-        return "Keyword City Jobs"
+    return np.select(conditions,choices,default="Other")
 
-    if "jobs-in" in url:
-        return "City Jobs"
+# -----------------------------
+# BRAND CLASSIFICATION
+# -----------------------------
 
-    if "-jobs" in url:
-        return "Keyword Jobs"
+BRAND_RE = re.compile("|".join(map(re.escape,brand_keywords)), re.IGNORECASE)
 
-    return "Other"
+def classify_keywords(keywords):
 
-current_df["section"] = current_df["page"].apply(classify_page)
+    return np.where(keywords.str.contains(BRAND_RE), "Brand", "Non Brand")
 
 # -----------------------------
-# BRAND CLASSIFICATION
+# PREPARE DATA
 # -----------------------------
 
-def classify_keyword(k):
+# date parsing and the row-wise classifications are the expensive part of a
+# rerun; keep the prepared frames in session state so changing a filter only
+# re-filters instead of re-deriving 25k rows
+if st.session_state.get("prepared_month") != selected_month:
+
+    current_df["date"] = pd.to_datetime(current_df["date"])
 
-    k = k.lower()
+    if not prev_df.empty:
+        prev_df["date"] = pd.to_datetime(prev_df["date"])
 
-    for b in brand_keywords:
-        if b in k:
-            return "Brand"
+    current_df["section"] = classify_pages(current_df["page"])
+    current_df["keyword_type"] = classify_keywords(current_df["keyword"])
 
-    return "Non Brand"
+    st.session_state["prepared_month"] = selected_month
+    st.session_state["prepared_current"] = current_df
+    st.session_state["prepared_prev"] = prev_df
 
-current_df["keyword_type"] = current_df["keyword"].apply(classify_keyword)
+current_df = st.session_state["prepared_current"]
+prev_df = st.session_state["prepared_prev"]
 
 # -----------------------------
 # APPLY FILTERS